@@ -16,7 +16,7 @@ import sys
 from numpy import full, nan
 
 from ._close_data import write_genome_metadata
-from ._util import EXT_GZ, maybe_gzip_open
+from ._util import maybe_gzip_open, SUFFIXES_COMPRESSED
 from ._hardmask_parsers import (get_bed_filter_region, get_wig_filter_region,
                                 merged_filter_region_generator)
 from . import Genome, __version__
@@ -27,7 +27,10 @@ BED_SUFFIXES = frozenset({".bed"})
 WIGGLE_FILETYPE = "wig"
 WIGGLE_SUFFIXES = frozenset({".wg", ".wig", ".wigVar", ".wigFix"})
 
-SUFFIX_GZ = "." + EXT_GZ
+# Find filetype based on (lowercase) file extension
+HARDMASK_FILETYPES = {suffix.lower(): BED_FILETYPE for suffix in BED_SUFFIXES}
+HARDMASK_FILETYPES.update((suffix.lower(), WIGGLE_FILETYPE)
+                          for suffix in WIGGLE_SUFFIXES)
 
 # Find which filter generator to call based on filetype
 FILTER_REGION_GENERATORS = {
@@ -107,26 +110,20 @@ def hardmask_data(gd_filename, hardmask_filename, track_names=None,
 
 def get_hardmask_filetype(hardmask_filename):
     filename = hardmask_filename.lower()
-    hardmask_filetype = None
 
     root_filename, file_extension = splitext(filename)
-    if file_extension == SUFFIX_GZ:
-        # Find the extension before gzip extension
+    if file_extension in SUFFIXES_COMPRESSED:
+        # Find the extension before compression extension
         root_filename, file_extension = splitext(root_filename)
 
-    if file_extension in BED_SUFFIXES:
-        hardmask_filetype = BED_FILETYPE
-    elif file_extension in WIGGLE_SUFFIXES:
-        hardmask_filetype = WIGGLE_FILETYPE
+    try:
+        return HARDMASK_FILETYPES[file_extension]
     # If no known filetype detected
-    else:
+    except KeyError:
         # Report an error
         raise ValueError("Mask {} file type not "
                          "supported.".format(hardmask_filename))
 
-    # Otherwise return the filetype
-    return hardmask_filetype
-
 
 def parse_hardmask_option(mask_option):
     """Gets a operator/value combination as a string and returns a function
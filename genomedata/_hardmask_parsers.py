@@ -24,6 +24,18 @@ BED_START_FIELD_INDEX = 1
 BED_END_FIELD_INDEX = 2
 BED_SCORE_FIELD_INDEX = 4
 
+# variableStep chrom=chrN [span=windowSize]
+WIG_VARIABLE_DEFINITION_REGEX = re.compile(WIG_VARIABLE_STEP_DEFINITION +
+                                           r"\s+chrom=(?P<chromosome>\w+)"
+                                           r"(\s+span=(?P<span>\d+))?")
+
+# fixedStep chrom=chrN start=position step=stepInterval [span=windowSize]
+WIG_FIXED_DEFINITION_REGEX = re.compile(WIG_FIXED_STEP_DEFINITION +
+                                        r"\s+chrom=(?P<chromosome>\w+)"
+                                        r"\s+start=(?P<start>\d+)"
+                                        r"\s+step=(?P<step>\d+)"
+                                        r"(\s+span=(?P<span>\d+))?")
+
 
 def passes_filter(filter_function, value):
     """Returns true if the filter doesn't exist or the filter does exist and
@@ -108,9 +120,10 @@ def get_bed_filter_region(filter_file_handle, filter_function):
         # If the score passes the filter or there is no filter or score
         if valid_line:
             # Return the result
+            # NB: int() ignores the trailing newline itself
             yield (fields[BED_CHROM_NAME_FIELD_INDEX],
                    int(fields[BED_START_FIELD_INDEX]),
-                   int(fields[BED_END_FIELD_INDEX].rstrip()))
+                   int(fields[BED_END_FIELD_INDEX]))
 
 
 def get_wig_filter_region(filter_file_handle, filter_function):
@@ -122,18 +135,6 @@ def get_wig_filter_region(filter_file_handle, filter_function):
     current_step = 1
     current_chromosome = "chr1"
 
-    # variableStep chrom=chrN [span=windowSize]
-    variable_definition_regex = re.compile(WIG_VARIABLE_STEP_DEFINITION +
-                                           r"\s+chrom=(?P<chromosome>\w+)"
-                                           r"(\s+span=(?P<span>\d+))?")
-
-    # fixedStep chrom=chrN start=position step=stepInterval [span=windowSize]
-    fixed_definition_regex = re.compile(WIG_FIXED_STEP_DEFINITION +
-                                        r"\s+chrom=(?P<chromosome>\w+)"
-                                        r"\s+start=(?P<start>\d+)"
-                                        r"\s+step=(?P<step>\d+)"
-                                        r"(\s+span=(?P<span>\d+))?")
-
     for line in ignore_comments(filter_file_handle):
         # If the current line starts with a number
         if line[0] in digits:
@@ -159,7 +160,9 @@ def get_wig_filter_region(filter_file_handle, filter_function):
             # Else (the current definition is a fixed step)
             else:
                 # Get the value
-                value = float(line.rstrip())
+                # NB: float() ignores the trailing newline itself, which is
+                # much faster than stripping it first
+                value = float(line)
                 # If a filter exists and the value passes the filter
                 if passes_filter(filter_function, value):
                     # NB: See comment on span above
@@ -171,7 +174,7 @@ def get_wig_filter_region(filter_file_handle, filter_function):
         # Otherwise the current line is a wiggle definition line
         else:
             # If the current definition is variable step
-            re_match = variable_definition_regex.match(line)
+            re_match = WIG_VARIABLE_DEFINITION_REGEX.match(line)
             if re_match:
                 # Update the current wig definition
                 current_wig_definition = WIG_VARIABLE_STEP_DEFINITION
@@ -184,7 +187,7 @@ def get_wig_filter_region(filter_file_handle, filter_function):
                 current_span = get_wiggle_span(new_span)
 
             # If the current definition line is fixed step
-            re_match = fixed_definition_regex.match(line)
+            re_match = WIG_FIXED_DEFINITION_REGEX.match(line)
             if re_match:
                 # Update the current wig definition
                 current_wig_definition = WIG_FIXED_STEP_DEFINITION
@@ -6,14 +6,12 @@ import tables
 
 from ._chromosome import (CONTINUOUS_DTYPE, Chromosome, _ChromosomeList,
                           MissingContinuousData, Supercontig, SEQ_DTYPE)
-from ._util import (decode_trackname, GenomedataDirtyWarning,
+from ._util import (decode_trackname, FILTERS_GZIP, GenomedataDirtyWarning,
                     GENOMEDATA_ENCODING, SUFFIX)
 
 CONTINUOUS_ATOM = tables.Float32Atom(dflt=nan)
 CONTINUOUS_CHUNK_SHAPE = (10000, 1)
 
-FILTERS_GZIP = tables.Filters(complevel=1)
-
 
 def _open_file(filename, *args, **kwargs):
     # From pytables 3 docs:
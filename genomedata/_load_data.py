@@ -7,7 +7,7 @@ _load_data.py: A python interface for both genomedata_load_data.c and
 load_genomedata.py
 """
 
-import struct
+import os
 import sys
 
 from argparse import ArgumentParser
@@ -15,10 +15,15 @@ from subprocess import PIPE, Popen
 
 from . import __version__
 from ._c_load_data import load_data_from_stdin
-from ._util import SUFFIX_GZ, die
+from ._util import die, SUFFIX_XZ, SUFFIXES_GZIP
 
 BIG_WIG_SIGNATURE = 0x888FFC26
 BIG_WIG_SIGNATURE_BYTE_SIZE = 4
+# the kent reference checks both little endian and big endian packing
+# of the 4 byte signature
+BIG_WIG_SIGNATURES = frozenset([
+    BIG_WIG_SIGNATURE.to_bytes(BIG_WIG_SIGNATURE_BYTE_SIZE, "little"),
+    BIG_WIG_SIGNATURE.to_bytes(BIG_WIG_SIGNATURE_BYTE_SIZE, "big")])
 BIG_WIG_READ_CMD = "bigWigToBedGraph"
 BEDTOOLS_CMD = "bedtools"
 BEDTOOLS_INTERSECT_CMD = "intersect"
@@ -44,8 +49,10 @@ def load_data(gdfilename, trackname, datafile, maskfile=None, verbose=False):
 
     if file_is_big_wig:
         read_cmd = [BIG_WIG_READ_CMD]
-    elif datafile.endswith(SUFFIX_GZ):
+    elif datafile.endswith(SUFFIXES_GZIP):
         read_cmd = ["zcat"]
+    elif datafile.endswith(SUFFIX_XZ):
+        read_cmd = ["xzcat"]
     else:
         read_cmd = ["cat"]  # XXX: useless use of cat
     read_cmd.append(datafile)
@@ -126,20 +133,18 @@ def load_data(gdfilename, trackname, datafile, maskfile=None, verbose=False):
 
 def is_big_wig(filename):
     """ Checks that the given filename refers to a valid bigWig file """
-    with open(filename, "rb") as big_wig_file:
-        signature_string = big_wig_file.read(BIG_WIG_SIGNATURE_BYTE_SIZE)
-
-    # unpack returns a tuple regardless of length
-    # the kent reference checks both little endian and big endian packing
-    # of the 4 byte signature
-    little_endian_signature = struct.unpack("<L", signature_string)[0]
-    big_endian_signature = struct.unpack(">L", signature_string)[0]
-
-    if (little_endian_signature == BIG_WIG_SIGNATURE or
-       big_endian_signature == BIG_WIG_SIGNATURE):
-        return True
-
-    return False
+    # read only the signature, without filling a whole stdio buffer
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        # not available on all platforms
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, BIG_WIG_SIGNATURE_BYTE_SIZE,
+                             os.POSIX_FADV_RANDOM)
+        signature_string = os.read(fd, BIG_WIG_SIGNATURE_BYTE_SIZE)
+    finally:
+        os.close(fd)
+
+    return signature_string in BIG_WIG_SIGNATURES
 
 
 def parse_args(args):
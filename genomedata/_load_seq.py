@@ -24,9 +24,10 @@ from tables import UInt8Atom
 from . import FILE_MODE_CHROMS, FORMAT_VERSION, Genome, __version__
 from ._chromosome import SEQ_DTYPE
 from ._util import (chromosome_name_map_parser,
-                    DEFAULT_CHROMOSOME_NAME_STYLE, FILTERS_GZIP,
-                    GENOMEDATA_ENCODING, GenomedataDirtyWarning,
-                    ignore_comments, LightIterator, maybe_gzip_open)
+                    DEFAULT_CHROMOSOME_NAME_STYLE, FastaIterator,
+                    FILTERS_GZIP, GENOMEDATA_ENCODING,
+                    GenomedataDirtyWarning, ignore_comments,
+                    ignore_comments_bulk, maybe_gzip_open)
 
 MIN_GAP_LEN = 100000
 assert not MIN_GAP_LEN % 2  # must be even for division
@@ -51,6 +52,9 @@ ASSEMBLY_REPORT_FIELD_DELIMITER = "\t"
 
 GAP_COMPONENT_TYPES = frozenset("NU")
 
+# decompress gzipped sequence on a worker thread (when isal is available)
+GZIP_THREADS = 1
+
 GenomicPosition = uint32
 GENOMIC_POSITION_0 = GenomicPosition(0)
 
@@ -123,7 +127,7 @@ def create_supercontig(chromosome, index, seq=None, start=None, end=None):
     supercontig = h5file.create_group(where, name)
 
     if seq is not None:
-        seq_array = frombuffer(seq.encode(GENOMEDATA_ENCODING), SEQ_DTYPE)
+        seq_array = frombuffer(seq, SEQ_DTYPE)
         h5file.create_carray(supercontig, "seq", SEQ_ATOM, seq_array.shape)
 
         # XXXopt: does this result in compression?
@@ -147,7 +151,8 @@ def create_supercontig(chromosome, index, seq=None, start=None, end=None):
 # it at some point.
 #
 # XXXopt: a numpy implementation might be better
-re_gap_segment = compile(r"""
+# a bytes pattern, because sequences are read as bytes
+re_gap_segment = compile((r"""
 (?:([^%s]{%d}[^%s]{%d,})                                  # group(1): ambig
    |                                                      #  OR
    ((?:(?:[%s]+|^)(?:[^%s]{1,%d}[^%s]{,%d}(?![^%s]))*)+)) # group(2): unambig
@@ -155,7 +160,7 @@ re_gap_segment = compile(r"""
        DNA_LETTERS_UNAMBIG, REGEX_SEGMENT_LEN,
        DNA_LETTERS_UNAMBIG, DNA_LETTERS_UNAMBIG, REGEX_SEGMENT_LEN,
        DNA_LETTERS_UNAMBIG, REGEX_SEGMENT_LEN-1,
-       DNA_LETTERS_UNAMBIG), VERBOSE)
+       DNA_LETTERS_UNAMBIG)).encode(GENOMEDATA_ENCODING), VERBOSE)
 
 
 def init_chromosome_start(chromosome):
@@ -394,11 +399,12 @@ def load_seq(gdfilename, filenames, verbose=False, mode=None,
                     if verbose:
                         print(filename, file=sys.stderr)
 
-                    with maybe_gzip_open(filename) as infile:
+                    with maybe_gzip_open(filename,
+                                         threads=GZIP_THREADS) as infile:
                         if seqfile_type == "agp":
                             # Read the entire assembly into a buffer
                             # Filter out comments
-                            agp_lines = ignore_comments(infile.readlines())
+                            agp_lines = ignore_comments_bulk(infile)
 
                             # Split AGP buffer by chromosome entries
                             agp_chromosome_buffer = defaultdict(list)
@@ -428,7 +434,7 @@ def load_seq(gdfilename, filenames, verbose=False, mode=None,
                                                   chromosome_name])
 
                         else:
-                            for defline, seq in LightIterator(infile):
+                            for defline, seq in FastaIterator(infile):
                                 name = get_chromosome_name(
                                     defline,
                                     chromosome_name_map,
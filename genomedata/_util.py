@@ -5,15 +5,47 @@ from __future__ import absolute_import, division, print_function
 # Copyright 2008-2014 Michael M. Hoffman <michael.hoffman@utoronto.ca>
 
 from argparse import ArgumentParser, FileType
-from contextlib import closing
-from gzip import open as _gzip_open
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from io import BufferedReader, FileIO, TextIOWrapper
+from lzma import open as _xz_open
+from mmap import ACCESS_READ, mmap
 from os import extsep
+from os.path import exists, getmtime
 import sys
+from typing import Callable, Optional
 
-from numpy import array, empty
+from numpy import amax, amin, asarray, full, maximum, minimum
 from tables import Filters
 
-FILTERS_GZIP = Filters(complevel=1)
+# isal (ISA-L) decompresses several times faster than zlib
+try:
+    from isal.igzip import open as _gzip_open
+except ImportError:
+    from gzip import open as _gzip_open
+
+_gzip_open_threaded: Optional[Callable]
+try:
+    import isal.igzip_threaded
+    _gzip_open_threaded = isal.igzip_threaded.open
+except ImportError:
+    _gzip_open_threaded = None
+
+# rapidgzip decompresses a single gzip file on many cores
+_rapidgzip_open: Optional[Callable]
+try:
+    import rapidgzip
+    _rapidgzip_open = rapidgzip.open
+except ImportError:
+    _rapidgzip_open = None
+
+# 0 tells rapidgzip to use every core. os.cpu_count() may return None
+RAPIDGZIP_PARALLELIZATION = 0
+
+# NB: stays with zlib rather than a faster Blosc codec. Blosc is only
+# registered by PyTables, so h5repack (used by genomedata-load) and other
+# HDF5 tools could not read the archive without installing a plugin
+FILTERS_GZIP = Filters(complevel=1, complib="zlib", shuffle=True)
 
 EXT = "genomedata"
 SUFFIX = extsep + EXT
@@ -21,8 +53,31 @@ SUFFIX = extsep + EXT
 EXT_GZ = "gz"
 SUFFIX_GZ = extsep + EXT_GZ
 
+# BGZF files are gzip files made of many members, so any gzip reader works
+EXT_BGZ = "bgz"
+SUFFIX_BGZ = extsep + EXT_BGZ
+
+EXT_BGZF = "bgzf"
+SUFFIX_BGZF = extsep + EXT_BGZF
+
+SUFFIXES_GZIP = (SUFFIX_GZ, SUFFIX_BGZ, SUFFIX_BGZF)
+
+EXT_XZ = "xz"
+SUFFIX_XZ = extsep + EXT_XZ
+
+SUFFIXES_COMPRESSED = SUFFIXES_GZIP + (SUFFIX_XZ,)
+
+# not .gzi, which bgzip and samtools use for an incompatible index format
+EXT_RAPIDGZIP_INDEX = "rapidgzip_index"
+SUFFIX_RAPIDGZIP_INDEX = extsep + EXT_RAPIDGZIP_INDEX
+
+GZIP_COMPRESSLEVEL = 1
+
 GENOMEDATA_ENCODING = "ascii"
 
+# stripped from the end of each FASTA line, the same as bytes.rstrip()
+SEQ_WHITESPACE = b" \t\n\r\v\f"
+
 DEFAULT_CHROMOSOME_NAME_STYLE = "UCSC-style-name"
 
 chromosome_name_map_parser = ArgumentParser(add_help=False)
@@ -47,35 +102,130 @@ def die(msg="Unexpected error."):
     sys.exit(1)
 
 
+def mmap_handle(handle):
+    """
+    returns a read-only mmap of the file behind handle, or None unless
+    handle is an uncompressed regular file that has not been read from yet
+    and has only \n line endings
+    """
+    buffer = getattr(handle, "buffer", handle)
+
+    # compressed handles have a fileno() too, but for the compressed data
+    if not (isinstance(buffer, BufferedReader)
+            and isinstance(buffer.raw, FileIO)):
+        return None
+
+    try:
+        if handle.tell():
+            return None
+
+        data = mmap(buffer.fileno(), 0, access=ACCESS_READ)
+    except (OSError, ValueError):
+        # pipes cannot be mapped, nor can empty files
+        return None
+
+    # text mode also ends lines at \r, which only the line by line path
+    # handles
+    if data.find(b"\r") >= 0:
+        data.close()
+        return None
+
+    return data
+
+
 class LightIterator(object):
     def __init__(self, handle):
         self._handle = handle
         self._defline = None
 
+        # uncompressed files are scanned in place instead of line by line
+        self._mmap = mmap_handle(handle)
+        self._mmap_pos = 0
+
     def __iter__(self):
         return self
 
-    def __next__(self):
-        lines = []
+    def _next_mmap_record(self):
+        data = self._mmap
+
+        while True:
+            start = self._mmap_pos
+
+            if data.closed or start >= len(data):
+                data.close()
+                raise StopIteration
+
+            if data[start:start + 1] != b">":
+                raise ValueError(
+                    "no definition line found at next position in %r"
+                    % self._handle)
+
+            defline_end = data.find(b"\n", start)
+            if defline_end < 0:
+                defline_end = len(data)
+
+            record_end = data.find(b"\n>", defline_end)
+            if record_end < 0:
+                record_end = len(data)
+            else:
+                record_end += 1  # keep the newline with this record
+
+            self._mmap_pos = record_end
+
+            encoding = getattr(self._handle, "encoding", GENOMEDATA_ENCODING)
+            defline = data[start + 1:defline_end].rstrip().decode(encoding)
+            has_seq_lines = record_end > defline_end + 1
+
+            # as in the line path, an empty definition line with no lines
+            # after it is replaced by the next one
+            if defline or has_seq_lines:
+                break
+
+        # a definition line with no lines after it ends iteration, but one
+        # followed only by blank lines gives an empty seq
+        if not has_seq_lines:
+            raise StopIteration
+
+        seq_lines = data[defline_end + 1:record_end]
+
+        # translate() removes every newline in a single pass. If newlines
+        # were the only whitespace, that is the same as stripping each line
+        seq = seq_lines.translate(None, SEQ_WHITESPACE)
+        if len(seq_lines) - len(seq) != seq_lines.count(b"\n"):
+            # keep whitespace inside lines, as the other parsers do
+            seq = b"".join([line.rstrip()
+                            for line in seq_lines.split(b"\n")])
+
+        return defline, seq
+
+    def _next_record(self):
+        if self._mmap is not None:
+            return self._next_mmap_record()
+
+        # extended in place to avoid keeping every line until a final join
+        seq = bytearray()
+        has_seq_lines = False
         defline_old = self._defline
 
         for line in self._handle:
             if not line:
-                if not defline_old and not lines:
+                if not defline_old and not has_seq_lines:
                     raise StopIteration
                 if defline_old:
                     self._defline = None
                     break
             elif line.startswith(">"):
                 self._defline = line[1:].rstrip()
-                if defline_old or lines:
+                if defline_old or has_seq_lines:
                     break
                 else:
                     defline_old = self._defline
             else:
-                lines.append(line.rstrip())
+                # bytes.rstrip() strips the same characters as the C parser
+                seq += line.encode(GENOMEDATA_ENCODING).rstrip()
+                has_seq_lines = True
 
-        if not lines:
+        if not has_seq_lines:
             raise StopIteration
 
         if defline_old is None:
@@ -83,31 +233,140 @@ class LightIterator(object):
                 "no definition line found at next position in %r"
                 % self._handle)
 
-        return defline_old, ''.join(lines)
+        return defline_old, seq
+
+    def __next__(self):
+        defline, seq = self._next_record()
+
+        return defline, bytes(seq)
 
     def next(self):
         return self.__next__()
 
 
+# the C extension parses large buffered chunks instead of single lines
+try:
+    from ._c_fasta import FastaIterator
+except ImportError:
+    FastaIterator = LightIterator
+
+
+# typed so that 0, 0.0, and False get different dtypes
+@lru_cache(maxsize=64, typed=True)
+def _scalar_dtype(scalar):
+    return asarray(scalar).dtype
+
+
 # XXX: suggest as default
 def fill_array(scalar, shape, dtype=None, *args, **kwargs):
     if dtype is None:
-        dtype = array(scalar).dtype
-
-    res = empty(shape, dtype, *args, **kwargs)
-    res.fill(scalar)
+        try:
+            dtype = _scalar_dtype(scalar)
+        except TypeError:
+            # unhashable, such as a 0-d array
+            dtype = asarray(scalar).dtype
 
-    return res
+    return full(shape, scalar, dtype, *args, **kwargs)
 
 
 # XXX: suggest as default
-def gzip_open(*args, **kwargs):
+def gzip_open(*args, threads=0, **kwargs):
+    """
+    threads: if nonzero and isal is available, (de)compress on this many
+    worker threads so the calling thread is not blocked
+    """
+    kwargs.setdefault("compresslevel", GZIP_COMPRESSLEVEL)
+
+    if threads and _gzip_open_threaded is not None:
+        return closing(_gzip_open_threaded(*args, threads=threads, **kwargs))
+
     return closing(_gzip_open(*args, **kwargs))
 
 
-def maybe_gzip_open(filename, mode="rt", *args, **kwargs):
-    if filename.endswith(SUFFIX_GZ):
-        return gzip_open(filename, mode=mode, *args, **kwargs)
+def is_index_current(index_filename, filename):
+    """
+    an index older than the file it describes was built for a previous
+    version of that file
+    """
+    return (exists(index_filename)
+            and getmtime(index_filename) >= getmtime(filename))
+
+
+def rapidgzip_open_indexed(filename, index_filename):
+    """
+    returns (infile, imported), where imported says whether the block
+    index in index_filename was usable
+    """
+    infile = _rapidgzip_open(filename,
+                             parallelization=RAPIDGZIP_PARALLELIZATION)
+
+    if not is_index_current(index_filename, filename):
+        return infile, False
+
+    try:
+        infile.import_index(index_filename)
+    except (OSError, RuntimeError, ValueError):
+        # a failed import may leave infile in an unknown state
+        infile.close()
+        infile = _rapidgzip_open(filename,
+                                 parallelization=RAPIDGZIP_PARALLELIZATION)
+        return infile, False
+
+    return infile, True
+
+
+@contextmanager
+def parallel_gzip_open(filename, mode="rt", encoding=None, errors=None,
+                       newline=None, cache_index=False):
+    """
+    read-only, decompresses on all cores with rapidgzip
+
+    cache_index: keep the block index beside filename so later runs can
+    skip building it. A stale or unreadable index is ignored and replaced
+    """
+    index_filename = filename + SUFFIX_RAPIDGZIP_INDEX
+    infile, imported_index = rapidgzip_open_indexed(filename, index_filename)
+
+    with infile:
+        if "b" in mode:
+            yield infile
+        else:
+            # keep a reference so the wrapper cannot close infile early
+            textfile = TextIOWrapper(infile, encoding=encoding,
+                                     errors=errors, newline=newline)
+            yield textfile
+
+        if cache_index and not imported_index:
+            try:
+                infile.export_index(index_filename)
+            except OSError:
+                pass  # the index is only an optimization
+
+
+def xz_open(*args, **kwargs):
+    return closing(_xz_open(*args, **kwargs))
+
+
+def maybe_gzip_open(filename, mode="rt", *args, threads=0, parallel=False,
+                    cache_index=False, **kwargs):
+    """
+    opens gzip (.gz, .bgz, .bgzf) and xz (.xz) files based on their suffix,
+    and anything else as a regular file
+
+    parallel: use all cores to read gzipped files if rapidgzip is
+    available. Otherwise falls back to gzip_open()
+
+    cache_index: see parallel_gzip_open()
+    """
+    if filename.endswith(SUFFIXES_GZIP):
+        if parallel and _rapidgzip_open is not None and "r" in mode:
+            return parallel_gzip_open(filename, mode, *args,
+                                      cache_index=cache_index, **kwargs)
+
+        return gzip_open(filename, mode=mode, threads=threads, *args,
+                         **kwargs)
+    elif filename.endswith(SUFFIX_XZ):
+        return xz_open(filename, mode=mode, *args, **kwargs)
     else:
         return open(filename, mode=mode, *args, **kwargs)
 
@@ -119,16 +378,37 @@ def init_num_obs(num_obs, continuous):
     return curr_num_obs
 
 
+# elementwise equivalents of reductions, which avoid stacking the old and
+# new extrema into a temporary array
+EXTREMA_UFUNCS = {amin: minimum,
+                  amax: maximum}
+
+
 def new_extrema(func, data, extrema):
     curr_extrema = func(data, 0)
 
-    return func([extrema, curr_extrema], 0)
+    try:
+        ufunc = EXTREMA_UFUNCS[func]
+    except KeyError:
+        return func([extrema, curr_extrema], 0)
+
+    return ufunc(extrema, curr_extrema)
 
 
 def ignore_comments(iterable):
     return (item for item in iterable if not item.startswith("#"))
 
 
+def ignore_comments_bulk(handle):
+    """
+    same as ignore_comments(handle), but reads the whole file at once and
+    returns a list. Only for files that fit in memory
+    """
+    # not str.splitlines(), which also splits on form feeds and other
+    # separators that readlines() leaves alone
+    return [line for line in handle.readlines() if not line.startswith("#")]
+
+
 def decode_trackname(trackname):
     return trackname.decode(GENOMEDATA_ENCODING)
 
@@ -81,8 +81,14 @@ load_data_module = Extension(
     define_macros=c_define_macros,
     py_limited_api=True)
 
+fasta_module = Extension(
+    '_c_fasta',  # needs to match C file PyInit definition
+    sources=["src/_c_fasta.c"],
+    define_macros=c_define_macros,
+    py_limited_api=True)
+
 
 if __name__ == "__main__":
     # place extension in the base genomedata package
     setup(ext_package="genomedata",
-          ext_modules=[load_data_module])
+          ext_modules=[load_data_module, fasta_module])
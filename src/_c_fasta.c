@@ -0,0 +1,383 @@
+/* _c_fasta.c: buffered FASTA parser used by genomedata-load-seq
+
+   FastaIterator yields the same records and raises the same errors as
+   _util.LightIterator. Instead of iterating over the handle line by line,
+   it reads large chunks from the handle, scans them for newlines with
+   memchr, and copies sequence spans directly into a growing buffer (as
+   kseq.h does)
+*/
+
+/** includes **/
+
+#define PY_SSIZE_T_CLEAN
+
+#include <ctype.h>
+#include <stdbool.h>
+
+#include <Python.h> /* includes stdio, string, errno, and stdlib */
+
+/** constants **/
+
+#define READ_CHUNK_SIZE 131072 /* 128 KiB per handle.read() */
+#define DEFLINE_START '>'
+
+/** typedefs **/
+
+typedef struct {
+  char *data;
+  Py_ssize_t len;
+  Py_ssize_t size;
+} buffer_type;
+
+typedef struct {
+  PyObject_HEAD
+  PyObject *handle;
+  PyObject *chunk;          /* bytes from the last handle.read() */
+  Py_ssize_t chunk_pos;     /* next unparsed offset in chunk */
+  bool eof;
+  bool at_line_start;
+  bool in_defline;          /* the current line is a definition line */
+  bool have_defline;        /* a definition line is waiting on its record */
+  bool have_seq_lines;      /* a sequence line, even blank, followed it */
+  Py_ssize_t seq_line_start; /* offset in seq where the current line began */
+  buffer_type defline;
+  buffer_type seq;
+} FastaIterator;
+
+/** buffer helper functions **/
+
+static int buffer_append(buffer_type *buffer, const char *src,
+                         Py_ssize_t len) {
+  Py_ssize_t new_size;
+  char *new_data;
+
+  if (buffer->len + len > buffer->size) {
+    new_size = buffer->size ? buffer->size : READ_CHUNK_SIZE;
+    while (new_size < buffer->len + len) {
+      new_size *= 2;
+    }
+
+    new_data = PyMem_Realloc(buffer->data, new_size);
+    if (!new_data) {
+      PyErr_NoMemory();
+      return -1;
+    }
+
+    buffer->data = new_data;
+    buffer->size = new_size;
+  }
+
+  memcpy(buffer->data + buffer->len, src, len);
+  buffer->len += len;
+
+  return 0;
+}
+
+/* same as str.rstrip(), but only for the part of buffer after start */
+static void buffer_rstrip(buffer_type *buffer, Py_ssize_t start) {
+  while (buffer->len > start
+         && isspace((unsigned char) buffer->data[buffer->len - 1])) {
+    buffer->len--;
+  }
+}
+
+static void buffer_free(buffer_type *buffer) {
+  PyMem_Free(buffer->data);
+  buffer->data = NULL;
+  buffer->len = 0;
+  buffer->size = 0;
+}
+
+/** FastaIterator **/
+
+/* returns 1 if there is unparsed input, 0 at end of file, -1 on error */
+static int fill_chunk(FastaIterator *self) {
+  PyObject *chunk;
+  PyObject *encoded;
+
+  if (self->chunk && self->chunk_pos < PyBytes_Size(self->chunk)) {
+    return 1;
+  }
+
+  if (self->eof) {
+    return 0;
+  }
+
+  chunk = PyObject_CallMethod(self->handle, "read", "n",
+                              (Py_ssize_t) READ_CHUNK_SIZE);
+  if (!chunk) {
+    return -1;
+  }
+
+  /* text mode handles (the default for maybe_gzip_open) return str */
+  if (PyUnicode_Check(chunk)) {
+    encoded = PyUnicode_AsUTF8String(chunk);
+    Py_DECREF(chunk);
+    if (!encoded) {
+      return -1;
+    }
+    chunk = encoded;
+  } else if (!PyBytes_Check(chunk)) {
+    Py_DECREF(chunk);
+    PyErr_SetString(PyExc_TypeError, "read() should return str or bytes");
+    return -1;
+  }
+
+  Py_XDECREF(self->chunk);
+  self->chunk = chunk;
+  self->chunk_pos = 0;
+
+  if (PyBytes_Size(chunk) == 0) {
+    self->eof = true;
+    return 0;
+  }
+
+  return 1;
+}
+
+static int end_line(FastaIterator *self) {
+  if (self->in_defline) {
+    buffer_rstrip(&self->defline, 0);
+  } else {
+    buffer_rstrip(&self->seq, self->seq_line_start);
+
+    /* like LightIterator, even a blank line may not precede the first
+       definition line */
+    if (!self->have_defline) {
+      PyErr_Format(PyExc_ValueError,
+                   "no definition line found at next position in %R",
+                   self->handle);
+      return -1;
+    }
+
+    self->have_seq_lines = true;
+  }
+
+  self->in_defline = false;
+  self->at_line_start = true;
+
+  return 0;
+}
+
+static PyObject *emit_record(FastaIterator *self) {
+  PyObject *defline;
+  PyObject *seq;
+
+  bool have_seq_lines = self->have_seq_lines;
+
+  self->have_defline = false;
+  self->have_seq_lines = false;
+
+  /* like LightIterator, a definition line with no lines after it ends
+     iteration, but one followed only by blank lines gives an empty seq */
+  if (!have_seq_lines) {
+    return NULL;
+  }
+
+  defline = PyUnicode_DecodeUTF8(self->defline.data, self->defline.len,
+                                 NULL);
+  if (!defline) {
+    return NULL;
+  }
+
+  seq = PyBytes_FromStringAndSize(self->seq.data, self->seq.len);
+  if (!seq) {
+    Py_DECREF(defline);
+    return NULL;
+  }
+
+  self->seq.len = 0;
+
+  return Py_BuildValue("(NN)", defline, seq);
+}
+
+static PyObject *FastaIterator_next(FastaIterator *self) {
+  const char *chunk_start;
+  const char *cur;
+  const char *end;
+  const char *newline;
+  const char *span_end;
+  int status;
+
+  for (;;) {
+    status = fill_chunk(self);
+    if (status < 0) {
+      return NULL;
+    }
+
+    if (status == 0) {
+      /* last line may lack a trailing newline */
+      if (!self->at_line_start && end_line(self) < 0) {
+        return NULL;
+      }
+
+      if (self->have_defline) {
+        return emit_record(self);
+      }
+
+      return NULL; /* StopIteration */
+    }
+
+    chunk_start = PyBytes_AsString(self->chunk);
+    cur = chunk_start + self->chunk_pos;
+    end = chunk_start + PyBytes_Size(self->chunk);
+
+    if (self->at_line_start) {
+      if (*cur == DEFLINE_START) {
+        /* leave the next definition line unparsed until the next call.
+           As in LightIterator, an empty definition line with no lines
+           after it is replaced by this one instead */
+        if (self->have_defline
+            && (self->defline.len || self->have_seq_lines)) {
+          return emit_record(self);
+        }
+
+        self->defline.len = 0;
+        self->have_defline = true;
+        self->in_defline = true;
+        cur++;
+      }
+
+      self->at_line_start = false;
+      self->seq_line_start = self->seq.len;
+    }
+
+    newline = memchr(cur, '\n', end - cur);
+    span_end = newline ? newline : end;
+
+    if (buffer_append(self->in_defline ? &self->defline : &self->seq,
+                      cur, span_end - cur) < 0) {
+      return NULL;
+    }
+
+    if (newline) {
+      if (end_line(self) < 0) {
+        return NULL;
+      }
+      cur = newline + 1;
+    } else {
+      cur = end;
+    }
+
+    self->chunk_pos = cur - chunk_start;
+  }
+}
+
+/* same as tp_iternext, but raises StopIteration itself */
+static PyObject *FastaIterator_next_method(FastaIterator *self,
+                                           PyObject *Py_UNUSED(ignored)) {
+  PyObject *record = FastaIterator_next(self);
+
+  if (!record && !PyErr_Occurred()) {
+    PyErr_SetNone(PyExc_StopIteration);
+  }
+
+  return record;
+}
+
+static int FastaIterator_init(FastaIterator *self, PyObject *args,
+                              PyObject *Py_UNUSED(kwds)) {
+  PyObject *handle;
+
+  if (!PyArg_ParseTuple(args, "O", &handle)) {
+    return -1;
+  }
+
+  Py_INCREF(handle);
+  Py_XDECREF(self->handle);
+  self->handle = handle;
+
+  Py_XDECREF(self->chunk);
+  self->chunk = NULL;
+  self->chunk_pos = 0;
+  self->eof = false;
+  self->at_line_start = true;
+  self->in_defline = false;
+  self->have_defline = false;
+  self->have_seq_lines = false;
+  self->seq_line_start = 0;
+  self->defline.len = 0;
+  self->seq.len = 0;
+
+  return 0;
+}
+
+static void FastaIterator_dealloc(FastaIterator *self) {
+  PyTypeObject *type = Py_TYPE(self);
+  freefunc tp_free = (freefunc) PyType_GetSlot(type, Py_tp_free);
+
+  Py_XDECREF(self->handle);
+  Py_XDECREF(self->chunk);
+  buffer_free(&self->defline);
+  buffer_free(&self->seq);
+
+  tp_free(self);
+  Py_DECREF(type); /* heap types hold a reference from each instance */
+}
+
+static PyMethodDef FastaIterator_methods[] = {
+  {"next", (PyCFunction) FastaIterator_next_method, METH_NOARGS,
+   "next()\n--\n\nReturn the next (defline, seq) pair"},
+  {NULL, NULL, 0, NULL} /* Sentinel */
+};
+
+static PyType_Slot FastaIterator_slots[] = {
+  {Py_tp_doc, "FastaIterator(handle)\n--\n\n"
+   "Iterate over (defline, seq) pairs of a FASTA file handle, where seq\n"
+   "is bytes"},
+  {Py_tp_new, PyType_GenericNew},
+  {Py_tp_init, FastaIterator_init},
+  {Py_tp_dealloc, FastaIterator_dealloc},
+  {Py_tp_iter, PyObject_SelfIter},
+  {Py_tp_iternext, FastaIterator_next},
+  {Py_tp_methods, FastaIterator_methods},
+  {0, NULL} /* Sentinel */
+};
+
+static PyType_Spec FastaIterator_spec = {
+  "genomedata._c_fasta.FastaIterator",
+  sizeof(FastaIterator),
+  0,
+  Py_TPFLAGS_DEFAULT,
+  FastaIterator_slots
+};
+
+/** module **/
+
+static struct PyModuleDef fastaModule = {
+    PyModuleDef_HEAD_INIT,
+    "_c_fasta", /* name of module */
+    NULL,           /* module documentation, may be NULL */
+    -1,             /* size of per-interpreter state of the module,
+          or -1 if the module keeps state in global variables. */
+    NULL,           /* m_methods */
+    NULL,           /* m_slots */
+    NULL,           /* m_traverse */
+    NULL,           /* m_clear */
+    NULL };         /* m_free */
+
+PyMODINIT_FUNC
+PyInit__c_fasta(void) /* name is important for ref on import */
+{
+  PyObject *module;
+  PyObject *fasta_iterator_type;
+
+  module = PyModule_Create(&fastaModule);
+  if (!module) {
+    return NULL;
+  }
+
+  fasta_iterator_type = PyType_FromSpec(&FastaIterator_spec);
+  if (!fasta_iterator_type) {
+    Py_DECREF(module);
+    return NULL;
+  }
+
+  if (PyModule_AddObject(module, "FastaIterator", fasta_iterator_type) < 0) {
+    Py_DECREF(fasta_iterator_type);
+    Py_DECREF(module);
+    return NULL;
+  }
+
+  return module;
+}
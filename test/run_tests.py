@@ -2,16 +2,32 @@
 
 from __future__ import absolute_import, division, print_function
 
+import io
 import os
 from os import chdir, remove
 import subprocess
+from tempfile import mkdtemp
 import unittest
 
+from numpy import array
+from numpy.testing import assert_array_equal
 from path import Path
 
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
 from genomedata._load_seq import load_seq
 from genomedata._close_data import close_data
+from genomedata._hardmask import (BED_FILETYPE, get_hardmask_filetype,
+                                  WIGGLE_FILETYPE)
+from genomedata._load_data import load_data
+from genomedata._open_data import open_data
 from genomedata.load_genomedata import load_genomedata
+from genomedata._util import (FastaIterator, fill_array,
+                              ignore_comments_bulk, LightIterator,
+                              maybe_gzip_open, SUFFIX_RAPIDGZIP_INDEX)
 from genomedata import Genome
 
 import test_genomedata
@@ -118,6 +134,22 @@ class TestParseBedGraphDOS(test_genomedata.GenomedataTester):
                           "OverlapSignalK562V2.dos.bedGraph")
 
 
+class TestCompressedXZ(test_genomedata.GenomedataTester):
+    def init(self):
+        self.mode = "file"
+        self.seqs = ["chr1.short.fa", "chrY.short.fa.xz"]
+        self.new_track = ("dnase", "wgEncodeDukeDNaseSeqBase"
+                          "OverlapSignalK562V2.bedGraph.xz")
+        self.filter = "filter_fixed.wig.xz"
+
+
+class TestCompressedBGZ(test_genomedata.GenomedataTester):
+    def init(self):
+        self.mode = "file"
+        self.seqs = ["chr1.short.fa", "chrY.short.fa.bgz"]
+        self.filter = "filter.bed.bgz"
+
+
 class TestGivenDataV0(test_genomedata.GenomedataGivenDataTester):
     def init(self):
         self.mode = "file"
@@ -267,6 +299,240 @@ class TestChromosomeNameTranslation(unittest.TestCase):
         remove(self.genomedata_name)
 
 
+class TestLoadCompressed(unittest.TestCase):
+
+    def setUp(self):
+        self.verbose = False
+        self.temp_dirpath = Path(mkdtemp(prefix="genomedata.test."))
+
+    def tearDown(self):
+        self.temp_dirpath.rmtree()
+
+    def load_seq(self, seq_filename):
+        genomedata_name = self.temp_dirpath.joinpath(
+            os.extsep.join([seq_filename, "genomedata"]))
+
+        load_seq(genomedata_name, [test_data_path(seq_filename)],
+                 self.verbose, "file")
+        close_data(genomedata_name, self.verbose)
+
+        return genomedata_name
+
+    def test_load_seq(self):
+        seqs = []
+        for seq_filename in ["chrY.short.fa.gz", "chrY.short.fa.bgz",
+                             "chrY.short.fa.xz"]:
+            with Genome(self.load_seq(seq_filename)) as genome:
+                chromosome = genome["chrY"]
+                seq = chromosome.seq[chromosome.start:chromosome.end]
+                seqs.append(seq.tobytes())
+
+        self.assertTrue(seqs[0])
+        self.assertEqual(seqs[1], seqs[0])
+        self.assertEqual(seqs[2], seqs[0])
+
+    def test_load_data_xz(self):
+        genomedata_name = self.load_seq("chr1.short.fa")
+        data_filename = test_data_path("wgEncodeDukeDNaseSeqBase"
+                                       "OverlapSignalK562V2.bedGraph")
+
+        open_data(genomedata_name, ["plain", "xz"], self.verbose)
+        load_data(genomedata_name, "plain", data_filename,
+                  verbose=self.verbose)
+        load_data(genomedata_name, "xz", data_filename + ".xz",
+                  verbose=self.verbose)
+        close_data(genomedata_name, self.verbose)
+
+        with Genome(genomedata_name) as genome:
+            chromosome = genome["chr1"]
+            assert_array_equal(chromosome[150:170, "xz"],
+                               chromosome[150:170, "plain"])
+            self.assertEqual(chromosome[160, "xz"], 1)
+
+    def test_hardmask_filetype(self):
+        for filename, filetype in [("filter.bed.bgz", BED_FILETYPE),
+                                   ("filter.BED.BGZF", BED_FILETYPE),
+                                   ("filter_fixed.wig.xz", WIGGLE_FILETYPE),
+                                   ("filter.wigFix.bgz", WIGGLE_FILETYPE)]:
+            self.assertEqual(get_hardmask_filetype(filename), filetype)
+
+
+class TestFastaIterator(unittest.TestCase):
+
+    def setUp(self):
+        self.seq_filenames = [test_data_path("chr1.short.fa"),
+                              test_data_path("chrY.short.fa.gz")]
+        self.temp_dirpath = Path(mkdtemp(prefix="genomedata.test."))
+
+    def tearDown(self):
+        self.temp_dirpath.rmtree()
+
+    def write_fasta(self, text):
+        filename = self.temp_dirpath.joinpath("test.fa")
+        with open(filename, "w", newline="") as outfile:
+            outfile.write(text)
+
+        return filename
+
+    def parse(self, text):
+        """
+        returns what FastaIterator and both the line and the memory-mapped
+        paths of LightIterator make of text: the records, or ValueError
+        """
+        filename = self.write_fasta(text)
+
+        def parse_records(iterator):
+            try:
+                return list(iterator)
+            except ValueError:
+                return ValueError
+
+        results = [parse_records(FastaIterator(io.StringIO(text))),
+                   parse_records(LightIterator(io.StringIO(text)))]
+
+        with maybe_gzip_open(filename) as infile:
+            iterator = LightIterator(infile)
+            # empty files cannot be mapped, and \r is left to the line path
+            self.assertEqual(iterator._mmap is None,
+                             not text or "\r" in text)
+            results.append(parse_records(iterator))
+
+        return results
+
+    def test_matches_light_iterator(self):
+        for seq_filename in self.seq_filenames:
+            with maybe_gzip_open(seq_filename) as infile:
+                expected = list(LightIterator(infile))
+            with maybe_gzip_open(seq_filename) as infile:
+                observed = list(FastaIterator(infile))
+
+            self.assertEqual(expected, observed)
+
+    def test_whitespace(self):
+        for text, expected in [
+                (">chr1\nAC GT\n", [("chr1", b"AC GT")]),
+                (">chr1 \r\nAC\t\r\nGT \r\n", [("chr1", b"ACGT")]),
+                (">chr1\n\nAC\n\n>chr2\nG T \nT",
+                 [("chr1", b"AC"), ("chr2", b"G TT")]),
+                (">chr1\nACGT\n>chr2\n", [("chr1", b"ACGT")]),
+                (">chr1\n>chr2\nAC\n", []),
+                (">chr1\n\n>chr2\nAC\n", [("chr1", b""), ("chr2", b"AC")]),
+                (">\n>chr2\nAC\n", [("chr2", b"AC")]),
+                ("", [])]:
+            for observed in self.parse(text):
+                self.assertEqual(observed, expected)
+
+    def test_resume(self):
+        # a definition line with no lines after it stops iteration, which
+        # can then carry on from the next definition line
+        text = ">chr1\n>chr2\nAC\n"
+
+        with maybe_gzip_open(self.write_fasta(text)) as infile:
+            for iterator in [FastaIterator(io.StringIO(text)),
+                             LightIterator(io.StringIO(text)),
+                             LightIterator(infile)]:
+                self.assertEqual(list(iterator), [])
+                self.assertEqual(list(iterator), [("chr2", b"AC")])
+
+    def test_no_defline(self):
+        for text in ["ACGT\n>chr1\nACGT\n", "\n>chr1\nACGT\n"]:
+            self.assertEqual(self.parse(text), [ValueError] * 3)
+
+    def test_next(self):
+        iterator = FastaIterator(io.StringIO(">chr1\nACGT\n"))
+
+        self.assertEqual(iterator.next(), ("chr1", b"ACGT"))
+        with self.assertRaises(StopIteration):
+            iterator.next()
+
+
+class TestMaybeGzipOpen(unittest.TestCase):
+
+    def setUp(self):
+        self.seq_filename = test_data_path("chrY.short.fa.gz")
+        with maybe_gzip_open(self.seq_filename) as infile:
+            self.seq_text = infile.read()
+
+        self.temp_dirpath = Path(mkdtemp(prefix="genomedata.test."))
+
+    def tearDown(self):
+        self.temp_dirpath.rmtree()
+
+    def test_threads(self):
+        with maybe_gzip_open(self.seq_filename, threads=1) as infile:
+            self.assertEqual(infile.read(), self.seq_text)
+
+        filename = self.temp_dirpath.joinpath("threads.fa.gz")
+        with maybe_gzip_open(filename, "wt", threads=1) as outfile:
+            outfile.write(self.seq_text)
+        with maybe_gzip_open(filename) as infile:
+            self.assertEqual(infile.read(), self.seq_text)
+
+    def write_gzip(self, filename, text):
+        with maybe_gzip_open(filename, "wt") as outfile:
+            outfile.write(text)
+
+    def read_parallel(self, filename, **kwargs):
+        with maybe_gzip_open(filename, parallel=True, **kwargs) as infile:
+            return infile.read()
+
+    @unittest.skipIf(rapidgzip is None, "rapidgzip is not installed")
+    def test_parallel(self):
+        filename = self.temp_dirpath.joinpath("parallel.fa.gz")
+        self.write_gzip(filename, self.seq_text)
+
+        self.assertEqual(self.read_parallel(filename), self.seq_text)
+        self.assertFalse(os.path.exists(filename + SUFFIX_RAPIDGZIP_INDEX))
+
+    @unittest.skipIf(rapidgzip is None, "rapidgzip is not installed")
+    def test_parallel_stale_index(self):
+        filename = self.temp_dirpath.joinpath("parallel.fa.gz")
+        index_filename = filename + SUFFIX_RAPIDGZIP_INDEX
+
+        self.write_gzip(filename, self.seq_text)
+        self.assertEqual(self.read_parallel(filename, cache_index=True),
+                         self.seq_text)
+        self.assertTrue(os.path.exists(index_filename))
+        self.assertEqual(self.read_parallel(filename, cache_index=True),
+                         self.seq_text)
+
+        # rewriting the file makes the cached index older than it
+        new_text = self.seq_text * 2
+        self.write_gzip(filename, new_text)
+        self.assertEqual(self.read_parallel(filename, cache_index=True),
+                         new_text)
+        self.assertGreaterEqual(os.path.getmtime(index_filename),
+                                os.path.getmtime(filename))
+
+        # an index that looks current but does not match is also ignored
+        self.write_gzip(filename, self.seq_text)
+        file_mtime = os.path.getmtime(filename)
+        os.utime(index_filename, (file_mtime + 1, file_mtime + 1))
+        self.assertEqual(self.read_parallel(filename, cache_index=True),
+                         self.seq_text)
+
+
+class TestFillArray(unittest.TestCase):
+
+    def test_dtype(self):
+        self.assertEqual(fill_array(0, 2).dtype.kind, "i")
+        self.assertEqual(fill_array(0.0, 2).dtype.kind, "f")
+
+    def test_unhashable(self):
+        filled = fill_array(array(1.5), 3)
+
+        self.assertEqual(filled.tolist(), [1.5, 1.5, 1.5])
+
+
+class TestIgnoreCommentsBulk(unittest.TestCase):
+
+    def test_matches_readlines(self):
+        text = "# comment\nchr1\t1\x0c2\nchr2\n# comment\nchr3"
+
+        self.assertEqual(ignore_comments_bulk(io.StringIO(text)),
+                         ["chr1\t1\x0c2\n", "chr2\n", "chr3"])
+
+
 def main():
     dirpath = Path(__file__).dirname()
     if dirpath:
@@ -53,6 +53,8 @@ class GenomedataTesterBase(unittest.TestCase):
         self.verbose = False
         self.write = True
         self.mode = "dir"
+        # Placental includes data for chr1 and chrY
+        self.seqs = ["chr1.short.fa", "chrY.short.fa.gz"]
         self.tracks = {"vertebrate":
                        "chr1.phyloP44way.vertebrate.short.wigFix",
                        "placental": "chr1.phyloP44way.placental.short.wigFix",
@@ -264,8 +266,7 @@ class GenomedataTester(GenomedataTesterBase):
         GenomedataTesterBase.setUp(self)
 
         # Create Genomedata collection from test files
-        seqs = ["chr1.short.fa", "chrY.short.fa.gz"]
-        # Placental includes data for chr1 and chrY
+        seqs = self.seqs
         if self.mode == "dir":
             gdfilename = make_temp_dir()
 